@@ -0,0 +1,193 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import os
+import json
+import queue
+import hashlib
+import random
+import threading
+from PIL import Image
+from tqdm import tqdm
+from data_point_collector import count_pixels
+from class_schema import DEFAULT_CLASS_SCHEMA
+
+
+def histogram_cache_key(mask_path, schema=None):
+    """
+    Hash the mask directory and the parts of the schema that change the counts, identifying a histogram cache.
+    """
+    if schema is None:
+        schema = DEFAULT_CLASS_SCHEMA
+    identity = {"mask_path": os.path.abspath(mask_path), "classes": schema["classes"], "ignore": schema.get("ignore")}
+    return hashlib.md5(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_tile_histograms(mask_path, cache_file=None, schema=None):
+    """
+    Get the class histogram of every mask tile in a directory.
+    Histograms are read from cache_file when it was written for the same mask directory and schema and
+    every tile still has the same name, size and modification time, otherwise they are counted and written to it.
+    """
+    images = sorted(os.listdir(mask_path))
+    cache_key = histogram_cache_key(mask_path, schema)
+    # Size and modification time of every tile, so tiles rewritten under the same name are recounted
+    tile_stats = {}
+    for image in images:
+        stat = os.stat(os.path.join(mask_path, image))
+        tile_stats[image] = [stat.st_size, stat.st_mtime_ns]
+    if cache_file is not None and os.path.exists(cache_file):
+        with open(cache_file, "r") as f:
+            cache = json.load(f)
+        if cache.get("key") == cache_key and cache.get("tile_stats") == tile_stats:
+            return cache["histograms"]
+
+    histograms = {}
+    with tqdm(total=len(images), desc=f"Counting {os.path.basename(mask_path):<10}", unit='img', bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}', dynamic_ncols=True) as pbar:
+        for image in images:
+            histograms[image] = count_pixels(os.path.join(mask_path, image), schema)
+            pbar.update(1)
+
+    if cache_file is not None:
+        with open(cache_file, "w") as f:
+            json.dump({"key": cache_key, "mask_path": os.path.abspath(mask_path), "tile_stats": tile_stats, "histograms": histograms}, f)
+    return histograms
+
+
+def compute_tile_weights(histograms, power=1.0):
+    """
+    Weight each tile by the rarity of the classes it contains.
+    A tile's weight is the sum of its class fractions times the inverse dataset frequency of each class,
+    raised to power. A power of 0 gives uniform sampling, larger powers favour minority classes more.
+    """
+    # Total pixel count of each class over the whole directory
+    class_totals = {}
+    for counts in histograms.values():
+        for class_name, count in counts.items():
+            class_totals[class_name] = class_totals.get(class_name, 0) + count
+    total_pixels = sum(class_totals.values())
+
+    # Rarity of each class is the inverse of its frequency, absent classes get no weight
+    rarity = {class_name: (total_pixels / count) ** power if count > 0 else 0.0 for class_name, count in class_totals.items()}
+
+    weights = []
+    for counts in histograms.values():
+        tile_pixels = sum(counts.values())
+        weights.append(sum(count / tile_pixels * rarity[class_name] for class_name, count in counts.items()) if tile_pixels > 0 else 0.0)
+    return weights
+
+
+def build_alias_table(weights):
+    """
+    Build the probability and alias tables for Vose's alias method so each draw costs O(1).
+    """
+    n = len(weights)
+    total = sum(weights)
+    if n == 0 or total <= 0:
+        raise ValueError("At least one tile must have a positive sampling weight.")
+
+    # Scale the weights so the average bucket holds exactly 1.0
+    scaled = [weight * n / total for weight in weights]
+    probability = [0.0] * n
+    alias = [0] * n
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+    # Pair each under-full bucket with an over-full one
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        probability[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = scaled[l] + scaled[s] - 1.0
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+
+    # Whatever remains is full up to floating point error
+    for i in large + small:
+        probability[i] = 1.0
+        alias[i] = i
+
+    return probability, alias
+
+
+def draw_from_alias_table(probability, alias, rng):
+    """
+    Draw a single index from the alias tables.
+    """
+    i = rng.randrange(len(probability))
+    return i if rng.random() < probability[i] else alias[i]
+
+
+class BalancedSampler:
+    """
+    Iterable that yields (SAR, mask) image pairs drawn with minority-weighted probabilities.
+    Images are loaded on a background thread and prefetched into a bounded queue.
+    """
+
+    def __init__(self, sar_path, mask_path, num_samples=None, power=1.0, prefetch=16, seed=None, cache_file=None, schema=None):
+        self.sar_path = sar_path
+        self.mask_path = mask_path
+        self.prefetch = prefetch
+        self.seed = seed
+
+        # Build the alias tables once from the per-tile class histograms
+        histograms = load_tile_histograms(mask_path, cache_file, schema)
+        self.images = list(histograms.keys())
+        self.weights = compute_tile_weights(histograms, power)
+        self.probability, self.alias = build_alias_table(self.weights)
+        self.num_samples = len(self.images) if num_samples is None else num_samples
+
+    def __len__(self):
+        return self.num_samples
+
+    def _load_pair(self, image):
+        # Fully load both images so the file handles are released on the loader thread
+        sar = Image.open(os.path.join(self.sar_path, image))
+        sar.load()
+        mask = Image.open(os.path.join(self.mask_path, image))
+        mask.load()
+        return sar, mask
+
+    def _put(self, output, stop, item):
+        # Wait for room in the queue, but give up as soon as the consumer stops
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producer(self, output, stop):
+        rng = random.Random(self.seed)
+        try:
+            for _ in range(self.num_samples):
+                item = self._load_pair(self.images[draw_from_alias_table(self.probability, self.alias, rng)])
+                if not self._put(output, stop, item):
+                    return
+        except Exception as e:
+            # Hand the error to the consumer so it is raised where the sampler is iterated
+            self._put(output, stop, e)
+            return
+        self._put(output, stop, None)
+
+    def __iter__(self):
+        output = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._producer, args=(output, stop), daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = output.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
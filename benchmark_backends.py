@@ -0,0 +1,343 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+from PIL import Image
+from class_schema import DEFAULT_CLASS_SCHEMA, parse_class_value
+from data_point_collector import count_pixels
+from dataset_expander import split_image_into_four, save_image
+
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module, peak memory is not reported there
+    resource = None
+
+
+# Registered backends for each stage, the reference backend of each kind is checked against all others
+BACKENDS = {"counting": {}, "tiling": {}, "encoding": {}}
+REFERENCE_BACKENDS = {"counting": "pil_reference", "tiling": "pil_reference", "encoding": "pil_reference"}
+
+# Color schema of the RGB masks in the corpus
+CORPUS_COLOR_SCHEMA = {
+    "classes": {"urban": [255, 0, 0], "agriculture": [0, 255, 0], "forest": [0, 0, 255], "peatland": [255, 255, 0], "water": [0, 255, 255]},
+    "ignore": [0, 0, 0],
+}
+
+# Mask encodings in the corpus, each mask uses the next one in turn
+CORPUS_MASK_KINDS = ["labels", "out_of_schema", "rgb", "palette"]
+
+
+def register_backend(kind, name):
+    """
+    Register a backend for the harness.
+    Counting backends take a mask path and its class schema and return class counts, tiling backends take an image path and
+    return the quadrants, encoding backends take an image and an output directory and return the written path.
+    """
+    def decorator(function):
+        BACKENDS[kind][name] = function
+        return function
+    return decorator
+
+
+@register_backend("counting", "pil_reference")
+def reference_count_pixels(image_path, schema=None):
+    # The original count_pixels, unchanged, it knows nothing of schemas and counts every pixel value
+    image = Image.open(image_path)
+    pixels = image.load()
+    color_counts = {0: 0, 1: 0, 2: 0, 3: 0, 4: 0}
+    for i in range(image.size[0]):
+        for j in range(image.size[1]):
+            color = pixels[i, j]
+            if color not in color_counts:
+                color_counts[color] = 1
+            else:
+                color_counts[color] += 1
+
+    color_counts["urban"] = color_counts.pop(0)
+    color_counts["agriculture"] = color_counts.pop(1)
+    color_counts["forest"] = color_counts.pop(2)
+    color_counts["peatland"] = color_counts.pop(3)
+    color_counts["water"] = color_counts.pop(4)
+    return dict(sorted(color_counts.items(), key=lambda x: x[1], reverse=True))
+
+
+@register_backend("counting", "vectorized")
+def vectorized_count_pixels(image_path, schema=None):
+    return count_pixels(image_path, schema)
+
+
+def reference_class_counts(color_counts, schema=None):
+    """
+    Map the raw pixel value counts of the reference onto the classes of a schema.
+    Values outside the schema or matching its ignore value are dropped, the way count_pixels drops them.
+    """
+    if schema is None:
+        schema = DEFAULT_CLASS_SCHEMA
+    raw = dict(color_counts)
+    # The reference names labels 0-4 after the default classes, turn them back into pixel values
+    for name, value in DEFAULT_CLASS_SCHEMA["classes"].items():
+        raw[value] = raw.pop(name)
+
+    class_counts = {}
+    for name, value in schema["classes"].items():
+        key, is_color = parse_class_value(value)
+        if is_color:
+            key = ((key >> 16) & 255, (key >> 8) & 255, key & 255)
+        class_counts[name] = raw.get(key, 0)
+    return class_counts
+
+
+@register_backend("tiling", "pil_reference")
+def reference_split_image(image_path):
+    return split_image_into_four(image_path)
+
+
+@register_backend("encoding", "pil_reference")
+def reference_encode_image(image, path):
+    image.save(os.path.join(path, "encoded.png"))
+    return os.path.join(path, "encoded.png")
+
+
+@register_backend("encoding", "save_image")
+def save_image_encode_image(image, path):
+    save_image(image, path, "encoded", "png")
+    return os.path.join(path, "encoded.png")
+
+
+def generate_corpus(path, count=8, size=512, seed=0):
+    """
+    Write a fixed synthetic corpus of SAR images and masks.
+    Masks are made of random class blocks so every class and plenty of boundaries are present. They cycle
+    through CORPUS_MASK_KINDS: label masks, label masks with nodata and unknown values, RGB masks and
+    palette masks. Returns the (image name, class schema) of every image.
+    """
+    os.makedirs(os.path.join(path, "sar"), exist_ok=True)
+    os.makedirs(os.path.join(path, "mask"), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    labels = np.array(list(DEFAULT_CLASS_SCHEMA["classes"].values()), dtype=np.uint8)
+    colors = np.array([CORPUS_COLOR_SCHEMA["ignore"]] + list(CORPUS_COLOR_SCHEMA["classes"].values()), dtype=np.uint8)
+    images = []
+    for i in range(count):
+        name = f"T{i:03d}_converted_RGB_{i}.png"
+        kind = CORPUS_MASK_KINDS[i % len(CORPUS_MASK_KINDS)]
+        sar = rng.integers(0, 256, (size, size), dtype=np.uint8)
+        schema = None
+        if kind == "out_of_schema":
+            # Labels 7 and 255 belong to no class, e.g. nodata borders
+            blocks = rng.choice(np.append(labels, [7, 255]).astype(np.uint8), (size // 32, size // 32))
+        elif kind == "rgb":
+            blocks = rng.integers(0, len(colors), (size // 32, size // 32))
+            schema = CORPUS_COLOR_SCHEMA
+        else:
+            blocks = rng.choice(labels, (size // 32, size // 32))
+        blocks = np.kron(blocks, np.ones((32, 32), dtype=blocks.dtype))
+
+        if kind == "rgb":
+            mask = Image.fromarray(colors[blocks])
+        elif kind == "palette":
+            # Palette masks store the labels as palette indices with a color for display
+            mask = Image.fromarray(blocks.astype(np.uint8), mode="L").convert("P")
+            mask.putpalette(colors[1:].ravel().tolist())
+        else:
+            mask = Image.fromarray(blocks.astype(np.uint8))
+        Image.fromarray(sar).save(os.path.join(path, "sar", name))
+        mask.save(os.path.join(path, "mask", name))
+        images.append((name, schema))
+    return images
+
+
+def outputs_equal(kind, reference, output, images):
+    """
+    Check a backend's outputs against the reference outputs.
+    Reference counts are mapped onto the schema of each mask, the backend's counts must already be by class.
+    """
+    for expected, actual, (_, schema) in zip(reference, output, images):
+        if kind == "counting":
+            if reference_class_counts(expected, schema) != dict(actual):
+                return False
+        elif kind == "tiling":
+            if expected.keys() != actual.keys():
+                return False
+            for key in expected:
+                if expected[key].mode != actual[key].mode or not np.array_equal(np.asarray(expected[key]), np.asarray(actual[key])):
+                    return False
+        elif not np.array_equal(expected, actual):
+            return False
+    return True
+
+
+def run_backend(kind, backend, corpus_path, images, work_path, decode=True):
+    """
+    Run a backend over the corpus once.
+    Encoded images are decoded again so the comparison is on pixels, not file bytes. Timed and memory
+    runs pass decode=False so the harness's own decode is not measured.
+    """
+    outputs = []
+    for image, schema in images:
+        if kind == "counting":
+            outputs.append(backend(os.path.join(corpus_path, "mask", image), schema))
+        elif kind == "tiling":
+            outputs.append(backend(os.path.join(corpus_path, "sar", image)))
+        else:
+            with Image.open(os.path.join(corpus_path, "sar", image)) as source:
+                written = backend(source, work_path)
+            if decode:
+                with Image.open(written) as encoded:
+                    outputs.append(np.asarray(encoded))
+    return outputs
+
+
+def peak_rss():
+    """
+    Get the peak resident set size of this process in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _memory_worker(kind, name, corpus_path, images, work_path, output):
+    # A forked child starts with its peak at the parent's current size, so only the growth is reported
+    before = peak_rss()
+    run_backend(kind, BACKENDS[kind][name], corpus_path, images, work_path, decode=False)
+    output.put(peak_rss() - before)
+
+
+def measure_peak_memory(kind, name, corpus_path, images, work_path):
+    """
+    Measure how much a backend grows the peak resident memory of a fresh child process over one corpus run.
+    Unlike tracemalloc this includes the C buffers of PIL and NumPy, so backends are comparable.
+    Returns None where there is no resource module or fork.
+    """
+    if resource is None or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    context = multiprocessing.get_context("fork")
+    output = context.Queue()
+    process = context.Process(target=_memory_worker, args=(kind, name, corpus_path, images, work_path, output))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Memory run of {kind}/{name} failed with exit code {process.exitcode}.")
+    return output.get()
+
+
+def measure_backend(kind, name, corpus_path, images, work_path, repeats):
+    """
+    Time a backend over the corpus and record its peak memory growth.
+    The fastest of the repeats is kept. Outputs for the comparison and memory come from separate runs,
+    so neither the harness's decode nor the child process is part of the time.
+    """
+    backend = BACKENDS[kind][name]
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run_backend(kind, backend, corpus_path, images, work_path, decode=False)
+        seconds.append(time.perf_counter() - start)
+
+    outputs = run_backend(kind, backend, corpus_path, images, work_path)
+    peak_memory = measure_peak_memory(kind, name, corpus_path, images, work_path)
+    return outputs, min(seconds), peak_memory
+
+
+def run_harness(kinds=None, corpus_size=8, repeats=3, baseline_path=None, margin=0.2, update_baseline=False):
+    """
+    Run every registered backend against the reference of its kind on the synthetic corpus.
+    Returns the results and the list of failures, a backend fails when its outputs differ from the
+    reference or it is slower than its stored baseline by more than margin.
+    """
+    if kinds is None:
+        kinds = list(BACKENDS.keys())
+    baseline = {}
+    if baseline_path is not None and os.path.exists(baseline_path):
+        with open(baseline_path, "r") as f:
+            baseline = json.load(f)
+
+    results = []
+    failures = []
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_path:
+        # Work inside the temporary directory so save_image's split lists do not land in the project
+        os.chdir(temp_path)
+        try:
+            corpus_path = os.path.join(temp_path, "corpus")
+            work_path = os.path.join(temp_path, "encoded")
+            os.makedirs(work_path)
+            images = generate_corpus(corpus_path, corpus_size)
+
+            for kind in kinds:
+                reference, _, _ = measure_backend(kind, REFERENCE_BACKENDS[kind], corpus_path, images, work_path, 1)
+                for name in BACKENDS[kind]:
+                    outputs, seconds, peak_memory = measure_backend(kind, name, corpus_path, images, work_path, repeats)
+                    if kind == "counting" and name == REFERENCE_BACKENDS[kind]:
+                        # The reference counts raw pixel values, map them onto the classes before comparing
+                        outputs = [reference_class_counts(counts, schema) for counts, (_, schema) in zip(outputs, images)]
+                    equal = outputs_equal(kind, reference, outputs, images)
+                    baseline_seconds = baseline.get(kind, {}).get(name)
+                    regressed = baseline_seconds is not None and seconds > baseline_seconds * (1 + margin)
+                    results.append({
+                        "kind": kind,
+                        "name": name,
+                        "seconds": seconds,
+                        "peak_memory": peak_memory,
+                        "equal": equal,
+                        "baseline_seconds": baseline_seconds,
+                        "regressed": regressed,
+                    })
+                    if not equal:
+                        failures.append(f"{kind}/{name} output differs from {REFERENCE_BACKENDS[kind]}")
+                    if regressed and not update_baseline:
+                        failures.append(f"{kind}/{name} took {seconds:.4f}s, baseline {baseline_seconds:.4f}s (+{margin*100:.0f}% allowed)")
+        finally:
+            os.chdir(previous_cwd)
+
+    if update_baseline and baseline_path is not None:
+        for result in results:
+            baseline.setdefault(result["kind"], {})[result["name"]] = result["seconds"]
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=4)
+
+    return results, failures
+
+
+def print_results(results):
+    # Peak memory is the growth of peak RSS in a child process running the backend once
+    print(f"{'Backend':<32}{'seconds':>10}{'baseline':>10}{'RSS MiB':>10}{'equal':>8}")
+    for result in results:
+        baseline_seconds = f"{result['baseline_seconds']:.4f}" if result["baseline_seconds"] is not None else "-"
+        peak_memory = f"{result['peak_memory'] / 2**20:.2f}" if result["peak_memory"] is not None else "-"
+        print(f"{result['kind'] + '/' + result['name']:<32}{result['seconds']:>10.4f}{baseline_seconds:>10}"
+              f"{peak_memory:>10}{str(result['equal']):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check counting, tiling and encoding backends against the PIL reference.")
+    parser.add_argument("--kinds", nargs="+", choices=list(BACKENDS.keys()), default=None, help="Kinds of backend to check (Default: all).")
+    parser.add_argument("--corpus-size", type=int, default=8, help="Number of synthetic images in the corpus.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per backend, the fastest is kept.")
+    parser.add_argument("--baseline", default="backend_baseline.json", help="JSON file with the stored timings.")
+    parser.add_argument("--margin", type=float, default=0.2, help="Allowed slowdown over the baseline (.2 = 20%%).")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the measured timings as the new baseline.")
+    args = parser.parse_args()
+
+    results, failures = run_harness(args.kinds, args.corpus_size, args.repeats, args.baseline, args.margin, args.update_baseline)
+    print_results(results)
+    if failures:
+        print("\nFailures:")
+        for failure in failures:
+            print(f"- {failure}")
+        sys.exit(1)
+    print("\nAll backends match the reference.")
+
+
+if __name__ == "__main__":
+    main()
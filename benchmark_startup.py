@@ -0,0 +1,67 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+
+# Modules whose import cost the headless path should never pay
+DEFERRED_MODULES = ["matplotlib"]
+
+
+def time_import(statement, runs):
+    """
+    Time a statement in fresh interpreters and return the wall time of each run in milliseconds.
+    """
+    timer = f"import time; start = time.perf_counter(); {statement}; print((time.perf_counter() - start) * 1000)"
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", timer], cwd=cwd, capture_output=True, text=True, check=True)
+        times.append(float(output.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def loaded_deferred_modules(statement):
+    """
+    Return the deferred modules that end up in sys.modules after running the statement.
+    """
+    check = f"import sys; {statement}; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run([sys.executable, "-c", check], cwd=cwd, capture_output=True, text=True, check=True)
+    return [module for module in output.stdout.strip().split(",") if module]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import cost of the headless pipeline.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of fresh interpreters per measurement.")
+    args = parser.parse_args()
+
+    statements = {
+        "headless (import entry)": "import entry",
+        "visualization (matplotlib.pyplot)": "import matplotlib.pyplot",
+    }
+    print(f"{'Import':<36}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for name, statement in statements.items():
+        try:
+            times = time_import(statement, args.runs)
+        except subprocess.CalledProcessError:
+            print(f"{name:<36}{'not installed':>32}")
+            continue
+        print(f"{name:<36}{statistics.median(times):>12.1f}{min(times):>10.1f}{max(times):>10.1f}")
+
+    # The headless path must not pull in any of the deferred modules
+    loaded = loaded_deferred_modules("import entry")
+    if loaded:
+        print(f"\nHeadless import loaded deferred modules: {', '.join(loaded)}")
+        sys.exit(1)
+    print("\nHeadless import loaded no deferred modules.")
+
+
+if __name__ == "__main__":
+    main()
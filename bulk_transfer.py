@@ -0,0 +1,134 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import os
+import errno
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+
+
+# Defaults for copies between filesystems
+MAX_WORKERS = 8
+BUFFER_SIZE = 16 * 1024 * 1024
+
+# Errors that mean a kernel copy call is not supported for this pair of files
+UNSUPPORTED_COPY_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def same_filesystem(src_dir, dst_dir):
+    """
+    Check if two directories are on the same filesystem, so a move can be a rename.
+    """
+    return os.stat(src_dir).st_dev == os.stat(dst_dir).st_dev
+
+
+def kernel_copy(fsrc, fdst, size, buffer_size):
+    """
+    Copy with copy_file_range, or sendfile if it is unavailable, so data never passes through Python.
+    Returns False when neither call is supported and nothing was copied.
+    """
+    for copy_call in ["copy_file_range", "sendfile"]:
+        if not hasattr(os, copy_call):
+            continue
+        offset = 0
+        try:
+            while offset < size:
+                if copy_call == "copy_file_range":
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), min(buffer_size, size - offset))
+                else:
+                    copied = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, min(buffer_size, size - offset))
+                if copied == 0:
+                    break
+                offset += copied
+            return True
+        except OSError as e:
+            # Only fall back when nothing was written yet
+            if e.errno not in UNSUPPORTED_COPY_ERRORS or offset > 0:
+                raise
+    return False
+
+
+def copy_file(src, dst, buffer_size=BUFFER_SIZE):
+    """
+    Copy a single file with large buffers and verify the size of the copy.
+    The destination must not exist yet, a partial copy is removed if anything fails.
+    """
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        try:
+            size = os.fstat(fsrc.fileno()).st_size
+            if not kernel_copy(fsrc, fdst, size, buffer_size):
+                shutil.copyfileobj(fsrc, fdst, buffer_size)
+        except BaseException:
+            os.remove(dst)
+            raise
+    try:
+        shutil.copystat(src, dst)
+        if os.path.getsize(dst) != size:
+            raise OSError(f"Size mismatch copying {src} to {dst}.")
+    except BaseException:
+        os.remove(dst)
+        raise
+
+
+def bulk_move(pairs, max_workers=MAX_WORKERS, buffer_size=BUFFER_SIZE, desc="Moving files"):
+    """
+    Move a batch of (source, destination) files as a unit.
+    Files on the same filesystem as their destination are renamed. The rest are copied in a bounded
+    thread pool and their sources are only deleted once every file in the batch has been moved.
+    If an exception is raised, the batch is rolled back so no file ends up only half moved.
+    Existing destinations are never overwritten, the batch is refused before anything is moved.
+    Only that rollback is guaranteed: if the process is killed or the machine loses power, the renames
+    done so far stay in place. Renames follow the order of pairs, so related files should be adjacent.
+    """
+    destinations = [os.path.abspath(dst) for _, dst in pairs]
+    if len(set(destinations)) != len(destinations):
+        raise ValueError("The same destination is given more than once in the batch.")
+    existing = [dst for dst in destinations if os.path.lexists(dst)]
+    if existing:
+        raise FileExistsError(f"{len(existing)} destination(s) already exist, e.g. {existing[0]}.")
+
+    renames = []
+    copies = []
+    filesystems = {}
+    for src, dst in pairs:
+        dirs = (os.path.dirname(os.path.abspath(src)), os.path.dirname(os.path.abspath(dst)))
+        if dirs not in filesystems:
+            filesystems[dirs] = same_filesystem(*dirs)
+        (renames if filesystems[dirs] else copies).append((src, dst))
+
+    copied = []
+    renamed = []
+
+    def copy_pair(src, dst):
+        # Record the copy as soon as it is complete so a rollback removes exactly what this batch wrote
+        copy_file(src, dst, buffer_size)
+        copied.append((src, dst))
+
+    try:
+        # Copy the files that cross filesystems first, the sources stay in place until the end
+        if copies:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                 tqdm(total=len(copies), desc=desc, unit='file', bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}', dynamic_ncols=True) as pbar:
+                futures = [executor.submit(copy_pair, src, dst) for src, dst in copies]
+                for future in as_completed(futures):
+                    future.result()
+                    pbar.update(1)
+
+        # Rename the files on the same filesystem
+        for src, dst in renames:
+            os.rename(src, dst)
+            renamed.append((src, dst))
+    except BaseException:
+        # Put the batch back the way it was, the sources of the copies were never touched
+        for _, dst in copied:
+            os.remove(dst)
+        for src, dst in reversed(renamed):
+            os.rename(dst, src)
+        raise
+
+    # Every file is in place, so the copied sources can be removed in the order of the batch
+    for src, _ in copies:
+        os.remove(src)
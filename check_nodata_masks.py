@@ -0,0 +1,72 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+from PIL import Image
+from data_point_collector import count_pixels
+from filter_dataset import initiate_filter
+from dataset_augmenter import find_minority_tiles
+
+
+def check_unknown_values(size=64):
+    """
+    Run counting, filtering and augmentation on masks holding values outside the schema.
+    One mask is entirely nodata (255) and one is partly nodata, neither may make a stage fail.
+    Returns the list of failures.
+    """
+    failures = []
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_path:
+        os.chdir(temp_path)
+        try:
+            for folder in ["train_SAR", "val_SAR", "test_SAR", "train_mask", "val_mask", "test_mask"]:
+                os.makedirs(os.path.join(temp_path, "split_images", folder))
+            masks = {
+                "labeled.png": np.full((size, size), 0, dtype=np.uint8),
+                "nodata.png": np.full((size, size), 255, dtype=np.uint8),
+                "partial.png": np.full((size, size), 3, dtype=np.uint8),
+            }
+            masks["partial.png"][:size // 2, :size // 2] = 255
+            for name, mask in masks.items():
+                Image.fromarray(mask).save(os.path.join(temp_path, "split_images", "train_mask", name))
+                Image.fromarray(np.zeros((size, size), dtype=np.uint8)).save(os.path.join(temp_path, "split_images", "train_SAR", name))
+
+            # Nodata pixels are left out of the counts
+            expected = {"nodata.png": 0, "partial.png": size * size - (size // 2) ** 2}
+            for name, total in expected.items():
+                counted = sum(count_pixels(os.path.join(temp_path, "split_images", "train_mask", name)).values())
+                if counted != total:
+                    failures.append(f"unknown values/{name} counted {counted} labeled pixels, expected {total}")
+
+            try:
+                initiate_filter([0.1])
+                filtered = sorted(os.listdir(os.path.join(temp_path, "filtered_images1", "train_mask")))
+                if filtered != ["labeled.png", "partial.png"]:
+                    failures.append(f"unknown values/filter kept {filtered}")
+                minority = find_minority_tiles(os.path.join(temp_path, "split_images", "train_mask"), 0.1)
+                if minority != ["labeled.png", "partial.png"]:
+                    failures.append(f"unknown values/augmenter found {minority}")
+            except Exception as e:
+                failures.append(f"unknown values/filtering raised {type(e).__name__}: {e}")
+        finally:
+            os.chdir(previous_cwd)
+    return failures
+
+
+def main():
+    failures = check_unknown_values()
+    if failures:
+        print("\nFailures:")
+        for failure in failures:
+            print(f"- {failure}")
+        sys.exit(1)
+    print("\nMasks with nodata and unknown values are handled.")
+
+
+if __name__ == "__main__":
+    main()
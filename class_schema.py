@@ -0,0 +1,124 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import json
+import numpy as np
+
+
+# Label values of the single channel masks this tool was written for
+DEFAULT_CLASS_SCHEMA = {
+    "classes": {"urban": 0, "agriculture": 1, "forest": 2, "peatland": 3, "water": 4},
+    "ignore": None,
+    "minority": ["urban", "peatland"],
+}
+
+
+def parse_class_value(value):
+    """
+    Convert a schema value to an integer key.
+    Label values stay as they are, RGB colors ([r, g, b] or "#rrggbb") are packed into 24 bits.
+    Returns the key and whether the value was a color.
+    """
+    if isinstance(value, str):
+        value = value.lstrip("#")
+        if len(value) != 6:
+            raise ValueError(f"Invalid color in class schema: #{value}")
+        return int(value, 16), True
+    if isinstance(value, (list, tuple)):
+        if len(value) != 3:
+            raise ValueError(f"Invalid color in class schema: {value}")
+        r, g, b = value
+        return (int(r) << 16) | (int(g) << 8) | int(b), True
+    return int(value), False
+
+
+def load_class_schema(schema_path):
+    """
+    Load a class schema from a JSON file.
+    The file maps class names to label values or RGB colors, with an optional ignore value and the
+    minority classes compared against the filter thresholds (Default: urban and peatland), e.g.
+    {"classes": {"urban": [255, 0, 0], "water": "#0000ff"}, "ignore": [0, 0, 0], "minority": ["urban"]}
+    """
+    with open(schema_path, "r") as f:
+        schema = json.load(f)
+    if "classes" not in schema or len(schema["classes"]) == 0:
+        raise ValueError("Class schema must define at least one class.")
+    schema.setdefault("ignore", None)
+    schema.setdefault("minority", DEFAULT_CLASS_SCHEMA["minority"])
+    build_lookup_table(schema)  # Validate the values before the schema is used
+    minority_classes(schema)
+    return schema
+
+
+def minority_classes(schema=None):
+    """
+    Get the names of the minority classes whose coverage is compared against the thresholds.
+    Raises a ValueError when the schema does not define one of them.
+    """
+    if schema is None:
+        schema = DEFAULT_CLASS_SCHEMA
+    minority = schema.get("minority", DEFAULT_CLASS_SCHEMA["minority"])
+    if len(minority) == 0:
+        raise ValueError("Class schema must name at least one minority class.")
+    missing = [name for name in minority if name not in schema["classes"]]
+    if missing:
+        raise ValueError(f"Minority classes {', '.join(missing)} are not defined in the class schema.")
+    return list(minority)
+
+
+def build_lookup_table(schema=None):
+    """
+    Build the sorted key table used to decode masks.
+    Returns the class names, the sorted keys, the class index of each key and whether keys are colors.
+    """
+    if schema is None:
+        schema = DEFAULT_CLASS_SCHEMA
+
+    names = list(schema["classes"].keys())
+    parsed = [parse_class_value(value) for value in schema["classes"].values()]
+    is_color = {color for _, color in parsed}
+    if schema.get("ignore") is not None:
+        is_color.add(parse_class_value(schema["ignore"])[1])
+    if len(is_color) != 1:
+        raise ValueError("Class schema must use either label values or RGB colors, not both.")
+
+    keys = np.array([key for key, _ in parsed], dtype=np.int64)
+    if len(np.unique(keys)) != len(keys):
+        raise ValueError("Class schema maps the same value to more than one class.")
+    if schema.get("ignore") is not None and parse_class_value(schema["ignore"])[0] in keys:
+        raise ValueError("Class schema ignore value is also used by a class.")
+    order = np.argsort(keys)
+    return names, keys[order], order.astype(np.int64), is_color.pop()
+
+
+def decode_mask(image, schema=None):
+    """
+    Decode a PIL mask into an array of class indices in one vectorized step.
+    Pixels matching the ignore value, or no class at all, are set to len(classes).
+    """
+    names, keys, indices, is_color = build_lookup_table(schema)
+
+    if is_color:
+        # Pack each RGB pixel into a single 24 bit integer
+        pixels = np.asarray(image.convert("RGB"), dtype=np.int64)
+        packed = (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+    else:
+        if image.mode in ("RGB", "RGBA"):
+            raise ValueError("RGB masks need a class schema defined with RGB colors.")
+        packed = np.asarray(image, dtype=np.int64)
+
+    # Look every pixel up in the sorted key table, unmatched pixels fall into the ignore bin
+    positions = np.minimum(np.searchsorted(keys, packed), len(keys) - 1)
+    return np.where(keys[positions] == packed, indices[positions], len(names))
+
+
+def count_classes(image, schema=None):
+    """
+    Count the pixels of each class in a PIL mask.
+    Returns a dictionary of class name to count, ignored pixels are not counted.
+    """
+    names = build_lookup_table(schema)[0]
+    counts = np.bincount(decode_mask(image, schema).ravel(), minlength=len(names) + 1)
+    return {name: int(count) for name, count in zip(names, counts[:len(names)])}
@@ -8,94 +8,46 @@
 import os
 from PIL import Image
 from tqdm import tqdm
+from class_schema import count_classes
 
-def count_pixels(image_path):
-    color_counts = {}
-
-    # Open the image from the specified path
-    image = Image.open(image_path)
-    pixels = image.load()
-
-    # Initialize the color counts dictionary
-    color_counts = {0: 0, 1: 0, 2: 0, 3: 0, 4: 0}
-
-    # Count the occurrence of each color in the image
-    for i in range(image.size[0]):
-        for j in range(image.size[1]):
-            color = pixels[i, j]
-            if color not in color_counts:
-                color_counts[color] = 1
-            else:
-                color_counts[color] += 1
-
-    # Change the keys to the class names
-    color_counts["urban"] = color_counts.pop(0)
-    color_counts["agriculture"] = color_counts.pop(1)
-    color_counts["forest"] = color_counts.pop(2)
-    color_counts["peatland"] = color_counts.pop(3)
-    color_counts["water"] = color_counts.pop(4)
-    
+def sort_class_counts(color_counts):
     # Sort the color counts by occurrence in descending order and return the result
     return dict(sorted(color_counts.items(), key=lambda x: x[1], reverse=True))
 
 
-def count_pixels_for_split_images(path, category, images):
+def count_pixels(image_path, schema=None):
+    # Open the image from the specified path and count the pixels of each class
+    with Image.open(image_path) as image:
+        color_counts = count_classes(image, schema)
+
+    return sort_class_counts(color_counts)
+
+
+def count_pixels_for_split_images(path, category, images, schema=None):
     color_counts = {}
 
     # Create a progress bar using tqdm
     with tqdm(total=len(images), desc=f"Processing {category}", unit='img', bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}', dynamic_ncols=True) as pbar:
-        # Count the occurrence of each color in the images
+        # Count the occurrence of each class in the images
         for image_file in images:
-            image = Image.open(os.path.join(path, image_file))
-            pixels = image.load()
-
-            for i in range(image.size[0]):
-                for j in range(image.size[1]):
-                    color = pixels[i, j]
-                    if color not in color_counts:
-                        color_counts[color] = 1
-                    else:
-                        color_counts[color] += 1
+            with Image.open(os.path.join(path, image_file)) as image:
+                for class_name, count in count_classes(image, schema).items():
+                    color_counts[class_name] = color_counts.get(class_name, 0) + count
 
             # Update the progress bar
             pbar.update()
 
-    # Change the keys to the class names
-    color_counts["urban"] = color_counts.pop(0)
-    color_counts["agriculture"] = color_counts.pop(1)
-    color_counts["forest"] = color_counts.pop(2)
-    color_counts["peatland"] = color_counts.pop(3)
-    color_counts["water"] = color_counts.pop(4)
-    
+    return sort_class_counts(color_counts)
 
-    # Sort the color counts by occurrence in descending order and return the result
-    return dict(sorted(color_counts.items(), key=lambda x: x[1], reverse=True))
-
-def add_count_for_two_images(image1, image2):
+def add_count_for_two_images(image1, image2, schema=None):
     color_counts = {}
-    # Count the occurrence of each color in the images
-    for image in [image1, image2]:
-        image = Image.open(image)
-        pixels = image.load()
-
-        for i in range(image.size[0]):
-            for j in range(image.size[1]):
-                color = pixels[i, j]
-                if color not in color_counts:
-                    color_counts[color] = 1
-                else:
-                    color_counts[color] += 1
-
-    # Change the keys to the class names
-    color_counts["urban"] = color_counts.pop(0)
-    color_counts["agriculture"] = color_counts.pop(1)
-    color_counts["forest"] = color_counts.pop(2)
-    color_counts["peatland"] = color_counts.pop(3)
-    color_counts["water"] = color_counts.pop(4)
-    
+    # Count the occurrence of each class in the images
+    for image_path in [image1, image2]:
+        with Image.open(image_path) as image:
+            for class_name, count in count_classes(image, schema).items():
+                color_counts[class_name] = color_counts.get(class_name, 0) + count
 
-    # Sort the color counts by occurrence in descending order and return the result
-    return dict(sorted(color_counts.items(), key=lambda x: x[1], reverse=True))
+    return sort_class_counts(color_counts)
 
 
 def percentage_of_class_pre(color_counts, total_pixels):
@@ -0,0 +1,172 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import os
+import argparse
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+from data_point_collector import count_pixels
+from class_schema import load_class_schema, minority_classes
+
+
+# Every augmentation returns a view of the input array, no pixels are copied
+AUGMENTATIONS = {
+    "FLIPH": np.fliplr,
+    "FLIPV": np.flipud,
+    "ROT90": lambda array: np.rot90(array, 1),
+    "ROT180": lambda array: np.rot90(array, 2),
+    "ROT270": lambda array: np.rot90(array, 3),
+}
+
+
+def find_minority_tiles(mask_path, threshold=0.1, schema=None):
+    """
+    Find the mask tiles whose coverage of any minority class is at or above the threshold.
+    Tiles that are already augmentations are skipped so variants are never augmented again.
+    """
+    minority = minority_classes(schema)
+    images = [image for image in sorted(os.listdir(mask_path)) if not is_augmented_entry(image)]
+    minority_tiles = []
+    with tqdm(total=len(images), desc=f"Scanning {os.path.basename(mask_path):<10}", unit='img', bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}', dynamic_ncols=True) as pbar:
+        for image in images:
+            class_counts = count_pixels(os.path.join(mask_path, image), schema)  # Get the pixel counts for classes
+            total_pixels = sum(class_counts.values())
+            # Tiles with no labeled pixels (all nodata or ignored) are never minority tiles
+            if total_pixels == 0:
+                pbar.update(1)
+                continue
+            if any(class_counts[name] / total_pixels >= threshold for name in minority):
+                minority_tiles.append(image)
+            pbar.update(1)
+    return minority_tiles
+
+
+def build_augmented_entries(images, augmentations=None):
+    """
+    Build the virtual tile names for every augmentation of every image.
+    Names follow the quadrant convention, e.g. T112_converted_RGB_1302_TL_ROT90.png.
+    """
+    if augmentations is None:
+        augmentations = list(AUGMENTATIONS.keys())
+    entries = []
+    for image in images:
+        stem, ext = os.path.splitext(image)
+        for augmentation in augmentations:
+            entries.append(f"{stem}_{augmentation}{ext}")
+    return entries
+
+
+def is_augmented_entry(image):
+    """
+    Check if a tile name ends with an augmentation suffix, e.g. T112_converted_RGB_1302_TL_FLIPH.png.
+    """
+    return os.path.splitext(image)[0].rsplit("_", 1)[-1] in AUGMENTATIONS
+
+
+def parse_augmented_entry(entry):
+    """
+    Split a virtual tile name back into its source image name and augmentation.
+    """
+    stem, ext = os.path.splitext(entry)
+    source, augmentation = stem.rsplit("_", 1)
+    if augmentation not in AUGMENTATIONS:
+        raise ValueError(f"Unknown augmentation in entry: {entry}")
+    return f"{source}{ext}", augmentation
+
+
+def write_augmented_txt_file(category, entries):
+    """
+    Write the virtual tile list for a category to augment_<category>.txt.
+    """
+    with open(f"augment_{category}.txt", "w") as f:
+        for entry in entries:
+            f.write(f"{entry}\n")
+
+
+def read_augmented_txt_file(category):
+    """
+    Read the virtual tile list for a category from augment_<category>.txt.
+    """
+    with open(f"augment_{category}.txt", "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def load_augmented_pair(sar_path, mask_path, entry):
+    """
+    Load the SAR and mask arrays for a virtual tile.
+    The returned arrays are read-only views of the decoded source images.
+    """
+    image, augmentation = parse_augmented_entry(entry)
+    sar = np.asarray(Image.open(os.path.join(sar_path, image)))
+    mask = np.asarray(Image.open(os.path.join(mask_path, image)))
+    return AUGMENTATIONS[augmentation](sar), AUGMENTATIONS[augmentation](mask)
+
+
+def materialize_augmentations(entries, sar_path, mask_path, output_sar_path, output_mask_path):
+    """
+    Write the virtual tiles to disk as real images.
+    The output directories must differ from the sources so the split images and their lists stay untouched.
+    """
+    for source_path, output_path in [(sar_path, output_sar_path), (mask_path, output_mask_path)]:
+        if os.path.abspath(source_path) == os.path.abspath(output_path):
+            raise ValueError(f"Augmented tiles can not be written into their source directory {source_path}.")
+    os.makedirs(output_sar_path, exist_ok=True)
+    os.makedirs(output_mask_path, exist_ok=True)
+
+    with tqdm(total=len(entries), desc="Materializing augmentations", unit='img', bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}', dynamic_ncols=True) as pbar:
+        for entry in entries:
+            image, augmentation = parse_augmented_entry(entry)
+            for source_path, output_path in [(sar_path, output_sar_path), (mask_path, output_mask_path)]:
+                with Image.open(os.path.join(source_path, image)) as source:
+                    augmented = Image.fromarray(AUGMENTATIONS[augmentation](np.asarray(source)))
+                    # Keep the palette so palette masks still decode to the same labels
+                    if source.mode == "P":
+                        augmented.putpalette(source.getpalette())
+                    augmented.save(os.path.join(output_path, entry))
+            pbar.update(1)
+
+
+def initiate_augmentation(category="train", threshold=0.1, augmentations=None, materialize=False, base_path=None, schema=None, output_path=None):
+    """
+    Build the virtual augmented tile list for a category of the split images.
+    The augmented tiles are only written to disk when materialize is True, into output_path
+    (Default: augmented_images) so they never mix with the split images.
+    """
+    if base_path is None:
+        base_path = os.path.join(os.getcwd(), "split_images")
+    if output_path is None:
+        output_path = os.path.join(os.getcwd(), "augmented_images")
+    sar_path = os.path.join(base_path, f"{category}_SAR")
+    mask_path = os.path.join(base_path, f"{category}_mask")
+
+    entries = build_augmented_entries(find_minority_tiles(mask_path, threshold, schema), augmentations)
+    write_augmented_txt_file(category, entries)
+    print(f"{len(entries)} augmented tiles listed for {category}.")
+
+    if materialize:
+        materialize_augmentations(entries, sar_path, mask_path,
+                                  os.path.join(output_path, f"{category}_SAR"), os.path.join(output_path, f"{category}_mask"))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Augment minority-class tiles with flips and 90 degree rotations.")
+    parser.add_argument("--categories", nargs="+", default=["train"], help="Categories to augment.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Minimum coverage of any minority class (.1 = 10%%).")
+    parser.add_argument("--augmentations", nargs="+", choices=list(AUGMENTATIONS.keys()), default=None, help="Augmentations to apply (Default: all).")
+    parser.add_argument("--materialize", action="store_true", help="Write the augmented tiles to disk.")
+    parser.add_argument("--output-path", help="Directory the augmented tiles are written to (Default: augmented_images).")
+    parser.add_argument("--class-schema", help="JSON class schema mapping class names to label values or RGB colors.")
+    args = parser.parse_args()
+
+    schema = load_class_schema(args.class_schema) if args.class_schema else None
+    for category in args.categories:
+        initiate_augmentation(category, args.threshold, args.augmentations, args.materialize, schema=schema, output_path=args.output_path)
+    print("Dataset augmented successfully.")
+
+
+if __name__ == "__main__":
+    main()
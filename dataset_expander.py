@@ -7,13 +7,13 @@
 
 import os
 from PIL import Image
-import matplotlib.pyplot as plt
 
 
-def save_image(image, path, filename, ext="png"):
+def save_image(image, path, filename, ext="png", strict=False):
     """
     Save the image with a specific suffix and original format. 
     Save the filename to a corresponding text file for later use.
+    Errors are printed, or raised when strict is True.
     """
     try:
         # Save the image at the specified path with the given filename and extension
@@ -33,13 +33,16 @@ def save_image(image, path, filename, ext="png"):
                     f.write(f"{filename}.{ext}\n")
                     
     except Exception as e:
+        if strict:
+            raise
         print(f"Failed to save image: {str(e)}")
         return
 
 
-def split_image_into_four(image_path):
+def split_image_into_four(image_path, strict=False):
     """
     Split the image into 4 images of equal size and resize back to original dimensions.
+    Errors are printed and None returned, or raised when strict is True.
     """
     try:
         # Open the image from the specified path
@@ -56,6 +59,8 @@ def split_image_into_four(image_path):
             return {key: quadrant.resize((width, height)) for key, quadrant in quadrants.items()}
                 
     except Exception as e:
+        if strict:
+            raise
         print(f"Failed to split image: {str(e)}")
         return
 
@@ -65,6 +70,9 @@ def show_segmented_image(save_location, image_files):
     Display images found in image_files as a 2x2 grid with no axis labels and a narrow space
     between images. Assumes there are exactly four images to fit into the grid.
     """
+    # Import matplotlib only when displaying so headless runs do not pay for it
+    import matplotlib.pyplot as plt
+
     try:
         # Load images from specified files
         images = [Image.open(os.path.join(save_location, img)) for img in image_files]
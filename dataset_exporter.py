@@ -0,0 +1,147 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import io
+import os
+import json
+import random
+import argparse
+import tarfile
+from tqdm import tqdm
+from data_point_collector import count_pixels
+from class_schema import load_class_schema
+
+
+def read_txt_file(iteration):
+    """
+    Read the tile lists written by create_txt_file for a filtered iteration.
+    Returns a dictionary mapping each SAR folder to the list of tiles it contains.
+    """
+    tile_lists = {}
+    folder = None
+    with open(f"filter_{iteration}.txt", "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            # Folder headers are written as "<folder>:"
+            if line.endswith(":"):
+                folder = line[:-1]
+                tile_lists[folder] = []
+            elif folder is not None:
+                tile_lists[folder].append(line)
+    return tile_lists
+
+
+def write_shard(shard_path, samples, sar_path, mask_path, schema=None):
+    """
+    Write a list of (key, image name) samples to a single tar shard.
+    Each sample is stored as three consecutive members: the SAR tile, the mask tile and the class histogram.
+    """
+    with tarfile.open(shard_path, "w") as tar:
+        for key, image in samples:
+            ext = os.path.splitext(image)[1]
+            tar.add(os.path.join(sar_path, image), arcname=f"{key}.sar{ext}")
+            tar.add(os.path.join(mask_path, image), arcname=f"{key}.mask{ext}")
+
+            # Store the class histogram of the mask alongside the image pair
+            histogram = json.dumps(count_pixels(os.path.join(mask_path, image), schema)).encode("utf-8")
+            info = tarfile.TarInfo(name=f"{key}.cls.json")
+            info.size = len(histogram)
+            tar.addfile(info, io.BytesIO(histogram))
+
+
+def export_tier(iteration, category="train", shard_size=1000, output_path=None, schema=None):
+    """
+    Export a filtered tier into fixed-size tar shards with an index file.
+    The tiles exported are the ones listed in filter_<iteration>.txt for the given category.
+    """
+    cwd = os.getcwd()  # Get the current working directory
+    tier_path = os.path.join(cwd, f"filtered_images{iteration}")
+    sar_path = os.path.join(tier_path, f"{category}_SAR")
+    mask_path = os.path.join(tier_path, f"{category}_mask")
+    if output_path is None:
+        output_path = os.path.join(cwd, f"exported_shards{iteration}", category)
+    os.makedirs(output_path, exist_ok=True)
+
+    # Retrieve the tiles that passed the threshold for this category
+    images = read_txt_file(iteration).get(f"{category}_SAR", [])
+    if len(images) == 0:
+        print(f"No images to export in {category}.")
+        return
+
+    # Group the tiles into shards of shard_size samples each
+    shards = []
+    with tqdm(total=len(images), desc=f"Exporting {category:<10}", unit='img', bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}', dynamic_ncols=True) as pbar:
+        for start in range(0, len(images), shard_size):
+            shard_name = f"shard-{len(shards):06d}.tar"
+            samples = [(os.path.splitext(image)[0], image) for image in images[start:start + shard_size]]
+            write_shard(os.path.join(output_path, shard_name), samples, sar_path, mask_path, schema)
+            shards.append({"name": shard_name, "num_samples": len(samples), "keys": [key for key, _ in samples]})
+            pbar.update(len(samples))
+
+    # Write the index describing every shard in the export
+    index = {
+        "iteration": iteration,
+        "category": category,
+        "shard_size": shard_size,
+        "num_samples": len(images),
+        "shards": shards,
+    }
+    with open(os.path.join(output_path, "index.json"), "w") as f:
+        json.dump(index, f, indent=4)
+
+    return os.path.join(output_path, "index.json")
+
+
+def iterate_shards(index_path, shuffle=False, seed=None):
+    """
+    Stream the samples of an exported tier sequentially, one shard at a time.
+    Yields dictionaries holding the sample key, SAR bytes, mask bytes and class histogram.
+    Shuffling is done at the shard level so every shard is still read front to back.
+    """
+    with open(index_path, "r") as f:
+        index = json.load(f)
+
+    shard_names = [shard["name"] for shard in index["shards"]]
+    if shuffle:
+        random.Random(seed).shuffle(shard_names)
+
+    base_path = os.path.dirname(index_path)
+    for shard_name in shard_names:
+        # Open the shard in streaming mode so members are read strictly in order
+        with tarfile.open(os.path.join(base_path, shard_name), "r|") as tar:
+            sample = {}
+            for member in tar:
+                key, field = member.name.rsplit(".", 2)[:2]
+                if sample and sample["key"] != key:
+                    yield sample
+                    sample = {}
+                sample["key"] = key
+                data = tar.extractfile(member).read()
+                if field == "cls":
+                    sample["histogram"] = json.loads(data.decode("utf-8"))
+                else:
+                    sample[field] = data
+            if sample:
+                yield sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a filtered tier into tar shards for sequential reads.")
+    parser.add_argument("iteration", type=int, help="Filtered iteration to export (the N in filtered_imagesN).")
+    parser.add_argument("--categories", nargs="+", default=["train", "val", "test"], help="Categories to export.")
+    parser.add_argument("--shard-size", type=int, default=1000, help="Number of tiles per shard.")
+    parser.add_argument("--class-schema", help="JSON class schema mapping class names to label values or RGB colors.")
+    args = parser.parse_args()
+
+    schema = load_class_schema(args.class_schema) if args.class_schema else None
+    for category in args.categories:
+        export_tier(args.iteration, category, args.shard_size, schema=schema)
+    print("Dataset exported successfully.")
+
+
+if __name__ == "__main__":
+    main()
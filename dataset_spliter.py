@@ -6,16 +6,21 @@
 """
 
 import os
-import shutil
+import math
+from bulk_transfer import bulk_move
 
 
 def split_files(path, train_ratio, val_ratio, test_ratio):
     """Split files into train, validation, and test sets based on specified ratios."""
+    # List all files in the specified directory, sorted so the split is reproducible
+    return split_file_list(sorted(os.listdir(path)), train_ratio, val_ratio, test_ratio)
+
+
+def split_file_list(files, train_ratio, val_ratio, test_ratio):
+    """Split a list of files into train, validation, and test sets based on specified ratios."""
     # Check that the input ratios add up to 1.0
-    assert train_ratio + val_ratio + test_ratio == 1.0, "Ratios must sum to 1.0"
+    assert math.isclose(train_ratio + val_ratio + test_ratio, 1.0), "Ratios must sum to 1.0"
     
-    # List all files in the specified directory
-    files = os.listdir(path)
     n_files = len(files)
     train_end = int(n_files * train_ratio)
     val_end = int(n_files * (train_ratio + val_ratio))
@@ -48,57 +53,65 @@ def make_directories():
     os.makedirs(os.path.join(cwd, 'split_images', 'test_mask'), exist_ok=True)
 
 
-def initiate_split(train_ratio=0.6, val_ratio=0.2, test_ratio=0.2):
-    """Initiate the splitting of files into training, validation, and testing directories."""
+def corresponding_mask_pairs(split, masks_path, cwd, sar_path=None):
+    """
+    Build the (source, destination) pairs that move each mask next to its SAR file's category.
+    When sar_path is given, each SAR file's own pair is placed right before the pairs of its masks.
+    """
+    train_files, val_files, test_files = split
+
+    # Group the masks by file stem so each SAR file finds its masks with a single lookup
+    masks_by_stem = {}
+    for mask in os.listdir(masks_path):
+        masks_by_stem.setdefault(mask.split('.')[0], []).append(mask)
+
+    pairs = []
+    for category, files in [('train', train_files), ('val', val_files), ('test', test_files)]:
+        for sar in files:
+            if sar_path is not None:
+                pairs.append((os.path.join(sar_path, sar),
+                              os.path.join(cwd, 'original_images', f'{category}_SAR', sar)))
+            for mask in masks_by_stem.pop(sar.split('.')[0], []):
+                pairs.append((os.path.join(masks_path, mask),
+                              os.path.join(cwd, 'original_images', f'{category}_mask', mask)))
+    return pairs
+
+
+def initiate_split(train_ratio=0.6, val_ratio=0.2, test_ratio=0.2, path=None, split=None, masks_path=None):
+    """
+    Initiate the splitting of SAR files and their masks into training, validation, and testing directories.
+    A precomputed (train_files, val_files, test_files) split can be given instead of the ratios.
+    SAR files and masks are moved in a single batch, so an error never leaves a scene without its mask.
+    Each scene's SAR file and masks are also adjacent in the batch, so a killed process leaves at most
+    one scene half moved.
+    """
     # Make directories for the training, validation, and testing sets
     make_directories()
     # Get the current working directory
     cwd = os.getcwd()
-    # Construct the path to the directory containing initial dumped files
-    path = os.path.join(cwd, 'dump_sar_here')
+    # Construct the paths to the directories containing initial dumped files and masks
+    if path is None:
+        path = os.path.join(cwd, 'dump_sar_here')
+    if masks_path is None:
+        masks_path = os.path.join(cwd, 'dump_masks_here')
     
     # Split the files into respective categories
-    train_files, val_files, test_files = split_files(path, train_ratio, val_ratio, test_ratio)
-
-    # Move each file to its corresponding new directory based on its category
-    for file in train_files:
-        shutil.move(os.path.join(path, file), 
-                    os.path.join(cwd, 'original_images', 'train_SAR', file))
-    for file in val_files:
-        shutil.move(os.path.join(path, file), 
-                    os.path.join(cwd, 'original_images', 'val_SAR', file))
-    for file in test_files:
-        shutil.move(os.path.join(path, file), 
-                    os.path.join(cwd, 'original_images', 'test_SAR', file))
-
-
-def move_corresponding_masks():
-    """Move corresponding mask files to match the SAR files in their respective directories."""
+    if split is None:
+        split = split_files(path, train_ratio, val_ratio, test_ratio)
+
+    # Move each file and its masks to the directories of its category as one batch, scene by scene
+    pairs = corresponding_mask_pairs(split, masks_path, cwd, sar_path=path)
+    bulk_move(pairs, desc="Moving SAR images and masks")
+
+
+def move_corresponding_masks(masks_path=None):
+    """Move corresponding mask files to match the SAR files already in their respective directories."""
     # Get the current working directory
     cwd = os.getcwd()
     # Construct the path to the directory containing initial dumped masks
-    masks_path = os.path.join(cwd, 'dump_masks_here')
-    # List all mask files
-    masks_files = os.listdir(masks_path)
+    if masks_path is None:
+        masks_path = os.path.join(cwd, 'dump_masks_here')
 
     # Retrieve lists of SAR files in each category directory
-    train_files = os.listdir(os.path.join(cwd, 'original_images', 'train_SAR'))
-    val_files = os.listdir(os.path.join(cwd, 'original_images', 'val_SAR'))
-    test_files = os.listdir(os.path.join(cwd, 'original_images', 'test_SAR'))
-
-    # Move each mask to match its corresponding SAR file in each category
-    for sar in train_files:
-        for mask in masks_files:
-            if sar.split('.')[0] == mask.split('.')[0]:
-                shutil.move(os.path.join(masks_path, mask), 
-                            os.path.join(cwd, 'original_images', 'train_mask', mask))
-    for sar in val_files:
-        for mask in masks_files:
-            if sar.split('.')[0] == mask.split('.')[0]:
-                shutil.move(os.path.join(masks_path, mask), 
-                            os.path.join(cwd, 'original_images', 'val_mask', mask))
-    for sar in test_files:
-        for mask in masks_files:
-            if sar.split('.')[0] == mask.split('.')[0]:
-                shutil.move(os.path.join(masks_path, mask), 
-                            os.path.join(cwd, 'original_images', 'test_mask', mask))
+    split = [os.listdir(os.path.join(cwd, 'original_images', f'{category}_SAR')) for category in ['train', 'val', 'test']]
+    bulk_move(corresponding_mask_pairs(split, masks_path, cwd), desc="Moving masks")
@@ -7,14 +7,26 @@
 
 import os
 import re
+import json
+import sys
+import math
+import argparse
 from tqdm import tqdm
-from dataset_spliter import *
-from dataset_expander import *
-from data_point_collector import *
-from filter_dataset import *
+from dataset_spliter import initiate_split
+from dataset_expander import split_image_into_four, save_image
+from data_point_collector import count_pixels_for_split_images
+from filter_dataset import initiate_filter
+from class_schema import load_class_schema
 
 
-def split_images(cwd=None):
+# Defaults used by automated mode and the headless command line
+DEFAULT_RATIOS = [0.6, 0.2, 0.2]
+DEFAULT_THRESHOLDS = [0.1, 0.12, 0.14, 0.16]
+CONFIG_KEYS = ["ratios", "thresholds", "root", "sar_path", "mask_path", "class_schema"]
+
+
+def split_images(cwd=None, strict=False):
+    # Errors are printed and the folder skipped, strict raises them instead so headless runs stop
     # Set the current working directory if not provided
     if cwd is None:
         cwd = os.getcwd()
@@ -28,16 +40,22 @@ def split_images(cwd=None):
         original_sub_folders = os.listdir(original_folder_path)
         split_sub_folders = os.listdir(split_folder_path)
     except FileNotFoundError as e:
+        if strict:
+            raise
         # Handle the case where a directory does not exist
         print(f"Error finding directory: {str(e)}")
         return
     except PermissionError as e:
+        if strict:
+            raise
         # Handle the case where permission is denied
         print(f"Permission denied: {str(e)}")
         return
 
     # Check if the number of subfolders in original and split match
     if len(original_sub_folders) != len(split_sub_folders):
+        if strict:
+            raise ValueError("Mismatch in the number of subfolders between original and split images.")
         print("Mismatch in the number of subfolders between original and split images.")
         return
     
@@ -62,13 +80,15 @@ def split_images(cwd=None):
                 for image in images:
                     # Process each image, split into four, and save each quadrant
                     image_path = os.path.join(original_images_path, image)
-                    images_split = split_image_into_four(image_path)
+                    images_split = split_image_into_four(image_path, strict)
                     for key, quadrant in images_split.items():
-                        save_image(quadrant, split_images_path, os.path.splitext(image)[0] + "_" + key, os.path.splitext(image)[1][1:])
+                        save_image(quadrant, split_images_path, os.path.splitext(image)[0] + "_" + key, os.path.splitext(image)[1][1:], strict)
                     
                     # Update the progress bar after each image is processed
                     pbar.update(1)
         except Exception as e:
+            if strict:
+                raise
             # Handle any other exceptions during image processing
             print(f"Failed to process folder {original_folder}: {str(e)}", flush=True)
             continue
@@ -83,13 +103,19 @@ def get_occurrence_percentage(dictionary):
     return {class_name: (count / sum(dictionary.values()) * 100) for class_name, count in dictionary.items()}
 
 
-def display_dataset_details(path, dataset_type, pixel_count_function, percentage_function, auto):
+def display_dataset_details(path, dataset_type, pixel_count_function, percentage_function, auto, schema=None):
     # Get the list of files in the directory
     files = os.listdir(path)
     
-    # Calculate the total number of classes and get the class occurrences
-    total_pixels = 512 * 512 * len(files)
-    class_counts = pixel_count_function(path, dataset_type, files)
+    # Get the class occurrences and report them
+    class_counts = pixel_count_function(path, dataset_type, files, schema)
+    report_dataset_details(path, dataset_type, class_counts, len(files), percentage_function, auto)
+    return class_counts
+
+
+def report_dataset_details(path, dataset_type, class_counts, num_files, percentage_function=get_occurrence_percentage, auto=False):
+    # Calculate the total number of classes
+    total_pixels = 512 * 512 * num_files
 
     # Display the results
     print(f"\nTotal number of classes in {dataset_type}: {total_pixels:,}")
@@ -105,43 +131,40 @@ def display_dataset_details(path, dataset_type, pixel_count_function, percentage
     print("")
 
     if auto:
-        # Check if path is filtered_images or split_images
-        if "split" in path:
-            with open(f"{dataset_type}_class_distribution.txt", "w") as f:
-                f.write(f"Total number of classes in {dataset_type}: {total_pixels:,}\n\n")
-                f.write(f"{dataset_type.capitalize()} class occurrences: \n")
-                for key, value in class_counts.items():
-                    f.write(f"{key}: {value:,}\n")
-                f.write("\n")
-                f.write(f"{dataset_type.capitalize()} class percentages: \n")
-                for key, value in class_percentages.items():
-                    f.write(f"{key}: {value:.3f}%\n")
-                f.write("\n")
-        elif "filtered" in path:
+        # Check if path is in filtered_images or split_images, only the folder name is checked
+        # so an output root containing either word does not change the report name
+        tier = os.path.basename(os.path.dirname(os.path.normpath(path)))
+        if tier.startswith("split"):
+            report_name = f"{dataset_type}_class_distribution.txt"
+        elif tier.startswith("filtered"):
             # Split the number off the end of the filtered_images# folder
-            iteration = re.search(r"filtered_images(\d+)", path).group(1)
-            with open(f"filtered_{iteration}_class_distribution.txt", "w") as f:
-                f.write(f"Total number of classes in {dataset_type}: {total_pixels:,}\n\n")
-                f.write(f"{dataset_type.capitalize()} class occurrences: \n")
-                for key, value in class_counts.items():
-                    f.write(f"{key}: {value:,}\n")
-                f.write("\n")
-                f.write(f"{dataset_type.capitalize()} class percentages: \n")
-                for key, value in class_percentages.items():
-                    f.write(f"{key}: {value:.3f}%\n")
-                f.write("\n")
+            iteration = re.search(r"filtered_images(\d+)", tier).group(1)
+            report_name = f"filtered_{iteration}_class_distribution.txt"
+        else:
+            return
+
+        with open(report_name, "w") as f:
+            f.write(f"Total number of classes in {dataset_type}: {total_pixels:,}\n\n")
+            f.write(f"{dataset_type.capitalize()} class occurrences: \n")
+            for key, value in class_counts.items():
+                f.write(f"{key}: {value:,}\n")
+            f.write("\n")
+            f.write(f"{dataset_type.capitalize()} class percentages: \n")
+            for key, value in class_percentages.items():
+                f.write(f"{key}: {value:.3f}%\n")
+            f.write("\n")
 
 
-def process_dataset(dataset_path, dataset_type="dataset", auto=False):
-    display_dataset_details(dataset_path, dataset_type, count_pixels_for_split_images, get_occurrence_percentage, auto)
+def process_dataset(dataset_path, dataset_type="dataset", auto=False, schema=None):
+    return display_dataset_details(dataset_path, dataset_type, count_pixels_for_split_images, get_occurrence_percentage, auto, schema)
 
 
-def check_image_count(dir_path, catgory, auto=False):
+def check_image_count(dir_path, catgory, auto=False, schema=None):
     if len(os.listdir(dir_path)) == 0:
         print(f"No images to process in {catgory}.")
         return
     else:
-        process_dataset(dir_path, catgory, auto=auto)
+        return process_dataset(dir_path, catgory, auto=auto, schema=schema)
 
 
 def validate_all_images_have_pairs(sar_path, mask_path):
@@ -166,59 +189,180 @@ def create_txt_file(iteration):
             f.write("\n")
         
 
-def automated_main():
+def run_pipeline(ratios=None, thresholds=None, root=None, sar_path=None, mask_path=None, class_schema=None, split=None):
     """
-    1. Clear the dump directories
-    2. Split the files into training, validation, and testing sets (Default: 0.6, 0.2, 0.2)
-    3. Move corresponding mask files to match the SAR files in their respective directories
-    4. Split the images into quadrants
-    5. Check the class distribution post split
-    6. Filter the dataset based on a threshold (Default: 10%, 12%, 14%, 16%)
-    7. Process the class distribution post filtration
-    8. Write the iteration file names that passed the threshold to a text file
+    Run every step of automated mode without prompting.
+    ratios are the train, val and test split ratios and thresholds the filtration levels.
+    root is the directory the pipeline writes into (Default: current working directory).
+    sar_path and mask_path are the dump directories (Default: dump_sar_here and dump_masks_here under root).
+    class_schema is a class schema dictionary or the path to its JSON file (Default: labels 0-4).
+    split is an optional precomputed (train_files, val_files, test_files) split used instead of the ratios.
+    Returns the class counts of each category for split_images and every filtered_images tier,
+    None for categories without images. Errors are raised instead of printed so batch jobs fail loudly.
     """
+    if ratios is None:
+        ratios = DEFAULT_RATIOS
+    if thresholds is None:
+        thresholds = DEFAULT_THRESHOLDS
+    if len(ratios) != 3 or not math.isclose(sum(ratios), 1.0):
+        raise ValueError("Exactly three split ratios summing to 1 are required.")
+    # Sort from lowest to highest threshold
+    thresholds = sorted(thresholds)
+    if isinstance(class_schema, str):
+        class_schema = load_class_schema(class_schema)
+
+    # Resolve the dump directories before moving into the root directory
+    if sar_path is not None:
+        sar_path = os.path.abspath(sar_path)
+    if mask_path is not None:
+        mask_path = os.path.abspath(mask_path)
+
+    previous_cwd = os.getcwd()
+    if root is not None:
+        os.makedirs(root, exist_ok=True)
+        os.chdir(root)
+
     try:
-        sar = os.path.join(os.getcwd(), "dump_sar_here")
-        masks = os.path.join(os.getcwd(), "dump_masks_here")
+        sar = sar_path if sar_path is not None else os.path.join(os.getcwd(), "dump_sar_here")
+        masks = mask_path if mask_path is not None else os.path.join(os.getcwd(), "dump_masks_here")
+
         # Check if all SAR images have corresponding masks
         if not validate_all_images_have_pairs(sar, masks):
-            print("Error: Not all SAR images have corresponding masks. Please ensure all images have pairs.")
-            return
+            raise ValueError("Not all SAR images have corresponding masks. Please ensure all images have pairs.")
 
         # Remove the readme files from the dump directories
-        os.remove(os.path.join(os.getcwd(), "dump_sar_here", "readme.txt"))
-        os.remove(os.path.join(os.getcwd(), "dump_masks_here", "readme.txt"))
-
-        # Split the files at the default ratios of 0.6, 0.2, 0.2
-        initiate_split()
-        move_corresponding_masks()
-        split_images()
+        for path in [sar, masks]:
+            if os.path.exists(os.path.join(path, "readme.txt")):
+                os.remove(os.path.join(path, "readme.txt"))
+
+        # Split the files and their masks at the requested ratios
+        initiate_split(*ratios, path=sar, split=split, masks_path=masks)
+        # A tile that can not be split stops the run, a partial split_images would skew every tier
+        split_images(strict=True)
         base_path = os.path.join(os.getcwd(), "split_images")
         val_mask_path = os.path.join(base_path, "val_mask")
         test_mask_path = os.path.join(base_path, "test_mask")
         train_mask_path = os.path.join(base_path, "train_mask")
-        check_image_count(val_mask_path, "val", True)
-        check_image_count(test_mask_path, "test", True)
-        check_image_count(train_mask_path, "train", True)
-        initiate_filter(auto=True)
-        folders = os.listdir(os.getcwd())
-        count = 0
-        for folder in folders:
-            if folder.startswith("filtered"):
-                count += 1
-        for i in range(1, count+1):
+        class_counts = {}
+        class_counts["split_images"] = {
+            "val": check_image_count(val_mask_path, "val", True, class_schema),
+            "test": check_image_count(test_mask_path, "test", True, class_schema),
+            "train": check_image_count(train_mask_path, "train", True, class_schema),
+        }
+        initiate_filter(thresholds, auto=True, schema=class_schema)
+        for i in range(1, len(thresholds)+1):
             filtered_images_path = os.path.join(os.getcwd(), f"filtered_images{i}")
             val_mask_path = os.path.join(filtered_images_path, "val_mask")
             test_mask_path = os.path.join(filtered_images_path, "test_mask")
             train_mask_path = os.path.join(filtered_images_path, "train_mask")
             print(f"\nFiltered Dataset {i}")
-            check_image_count(val_mask_path, "val", True)
-            check_image_count(test_mask_path, "test", True)
-            check_image_count(train_mask_path, "train", True)
+            class_counts[f"filtered_images{i}"] = {
+                "val": check_image_count(val_mask_path, "val", True, class_schema),
+                "test": check_image_count(test_mask_path, "test", True, class_schema),
+                "train": check_image_count(train_mask_path, "train", True, class_schema),
+            }
             create_txt_file(i)
+        return class_counts
+    finally:
+        os.chdir(previous_cwd)
+
+
+def automated_main():
+    """
+    1. Clear the dump directories
+    2. Split the files into training, validation, and testing sets (Default: 0.6, 0.2, 0.2)
+    3. Move corresponding mask files to match the SAR files in their respective directories
+    4. Split the images into quadrants
+    5. Check the class distribution post split
+    6. Filter the dataset based on a threshold (Default: 10%, 12%, 14%, 16%)
+    7. Process the class distribution post filtration
+    8. Write the iteration file names that passed the threshold to a text file
+    """
+    try:
+        run_pipeline()
     except Exception as e:
         print(f"Error: {str(e)}")
         return
+
+
+def load_config(config_path):
+    """
+    Load pipeline parameters from a JSON config file.
+    Accepted keys are ratios, thresholds, root, sar_path, mask_path and class_schema.
+    """
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    unknown_keys = set(config) - set(CONFIG_KEYS)
+    if unknown_keys:
+        raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown_keys))}")
+    return config
+
+
+def add_pipeline_arguments(parser, root=True):
+    parser.add_argument("--config", help="JSON file with any of: " + ", ".join(CONFIG_KEYS) + ".")
+    parser.add_argument("--ratios", nargs=3, type=float, help="Train, val and test split ratios (Default: 0.6 0.2 0.2).")
+    parser.add_argument("--thresholds", nargs="+", type=float, help="Filtration thresholds (Default: 0.1 0.12 0.14 0.16).")
+    if root:
+        parser.add_argument("--root", help="Directory to write the pipeline output into (Default: current directory).")
+    parser.add_argument("--sar-path", help="Directory holding the SAR images (Default: <root>/dump_sar_here).")
+    parser.add_argument("--mask-path", help="Directory holding the masks (Default: <root>/dump_masks_here).")
+    parser.add_argument("--class-schema", help="JSON class schema mapping class names to label values or RGB colors.")
+
+
+def pipeline_options(args):
+    # Command line arguments take precedence over the config file
+    config = load_config(args.config) if args.config else {}
+    return {key: getattr(args, key, None) if getattr(args, key, None) is not None else config.get(key) for key in CONFIG_KEYS}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SAR Image Dataset Expander. Runs interactively when no command is given.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Run the full pipeline without prompts.")
+    add_pipeline_arguments(run_parser)
+
+    shard_parser = subparsers.add_parser("shard", help="Run the pipeline on one hash partition of the scenes.")
+    shard_parser.add_argument("--shard-index", type=int, required=True, help="Index of this shard, from 0 to num-shards - 1.")
+    shard_parser.add_argument("--num-shards", type=int, required=True, help="Total number of shards.")
+    shard_parser.add_argument("--output-root", required=True, help="Directory the shard<index> output is written under.")
+    add_pipeline_arguments(shard_parser, root=False)
+
+    merge_parser = subparsers.add_parser("merge", help="Merge shard outputs into the layout of a single run.")
+    merge_parser.add_argument("--output-root", required=True, help="Directory to write the merged output into.")
+    merge_parser.add_argument("shard_roots", nargs="+", help="The shard<index> directories to merge.")
+
+    local_parser = subparsers.add_parser("local", help="Run every shard as a local process and merge the results.")
+    local_parser.add_argument("--num-shards", type=int, required=True, help="Number of local processes to run.")
+    local_parser.add_argument("--output-root", required=True, help="Directory to write the shards and merged output into.")
+    add_pipeline_arguments(local_parser, root=False)
+    return parser.parse_args(argv)
+
+
+def cli(argv=None):
+    args = parse_args(argv)
+    if args.command is None:
+        main()
+    elif args.command == "run":
+        try:
+            run_pipeline(**pipeline_options(args))
+        except Exception as e:
+            # Exit non-zero so batch schedulers see the failed run
+            print(f"Error: {str(e)}")
+            sys.exit(1)
+    else:
+        # Only load the shard runner when it is needed
+        import shard_runner
+
+        if args.command == "merge":
+            shard_runner.merge_shards(args.shard_roots, args.output_root)
+            return
+        options = pipeline_options(args)
+        options.pop("root")
+        if args.command == "shard":
+            shard_runner.run_shard(args.shard_index, args.num_shards, args.output_root, **options)
+        elif args.command == "local":
+            shard_runner.run_local_shards(args.num_shards, args.output_root, **options)
     
 
 def main():
@@ -266,7 +410,7 @@ Thank you for using the SAR Image Dataset Expander!
         response = input("Do you want to split and clear the dump directories? (y/n): ")
         if response.lower() == "y":
             # Check if all SAR images have corresponding masks
-            if not validate_all_images_have_pairs(sar, masks):
+            if not validate_all_images_have_pairs(os.path.join(os.getcwd(), "dump_sar_here"), os.path.join(os.getcwd(), "dump_masks_here")):
                 print("Error: Not all SAR images have corresponding masks. Please ensure all images have pairs.")
                 break
 
@@ -282,8 +426,7 @@ Thank you for using the SAR Image Dataset Expander!
                 # Ask user if they want to split the files at the default ratios of 0.6, 0.2, 0.2 or a custom ratio
                 response1 = input("Do you want to use the default split ratios of 0.6, 0.2, 0.2? (y/n): ")
                 if response1.lower() == "y":
-                    initiate_split()  # Default ratios for splitting are 0.6, 0.2, 0.2
-                    move_corresponding_masks()  # Ensure masks match the split SAR files
+                    initiate_split()  # Default ratios for splitting are 0.6, 0.2, 0.2, masks are moved with their SAR files
                     print("Files have been split and moved to the appropriate directories.\n")
                     break
                 elif response1.lower() == "n":
@@ -291,12 +434,14 @@ Thank you for using the SAR Image Dataset Expander!
                     while True:
                         try:
                             ratios = [float(x) for x in input("Enter the split ratios separated by a space (.6 = 60% | Order: Train, Val, Test): ").split()]
-                            # Ensure the sum of the ratios is equal to 1
-                            if sum(ratios) != 1:
+                            # Ensure there is one ratio per set and the ratios sum to 1
+                            if len(ratios) != 3:
+                                print("Enter exactly three ratios (Train, Val, Test). Please try again.")
+                                continue
+                            if not math.isclose(sum(ratios), 1.0):
                                 print("Sum of ratios must equal 1. Please try again.")
                                 continue
-                            initiate_split(ratios)  # Split files based on custom ratios
-                            move_corresponding_masks()  # Ensure masks match the split SAR files
+                            initiate_split(*ratios)  # Split files and their masks based on custom ratios
                             print("Files have been split and moved to the appropriate directories.\n")
                             break
                         except ValueError:
@@ -415,4 +560,4 @@ Thank you for using the SAR Image Dataset Expander!
 
     
 if __name__ == "__main__":
-    main()
+    cli()
@@ -9,12 +9,14 @@ import os
 from tqdm import tqdm
 import shutil
 from data_point_collector import count_pixels
+from class_schema import minority_classes
 
-def filter_dataset(thresholds, iteration, auto):
+def filter_dataset(thresholds, iteration, auto, schema=None):
     """
     Filter the dataset based on the threshold value.
-    Creates directories and filters images based on urban and peatland percentages.
+    Creates directories and filters images based on the minority class percentages (Default: urban and peatland).
     """
+    minority = minority_classes(schema)  # Fail before any directory is made if the schema lacks a class
     make_filtered_directories(iteration)  # Create directories for filtered images
     base_path = os.getcwd()  # Get the current working directory
     # Determine the path to the images to be filtered
@@ -35,13 +37,14 @@ def filter_dataset(thresholds, iteration, auto):
             with tqdm(total=len(os.listdir(folder_path)), desc=f"Filtering {folder:<10}", unit='img', bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}', dynamic_ncols=True) as pbar:
                 for image in os.listdir(folder_path):
                     image_path = os.path.join(folder_path, image)
-                    class_counts = count_pixels(image_path)  # Get the pixel counts for classes
+                    class_counts = count_pixels(image_path, schema)  # Get the pixel counts for classes
                     total_pixels = sum(class_counts.values())
-                    urban_percentage = class_counts["urban"] / total_pixels  # Calculate urban coverage
-                    peatland_percentage = class_counts["peatland"] / total_pixels  # Calculate peatland coverage
-
-                    # Filter based on threshold values for urban and peatland percentages
-                    if urban_percentage >= thresholds[iteration-1] or peatland_percentage >= thresholds[iteration-1]:
+                    # Tiles with no labeled pixels (all nodata or ignored) can not pass any threshold
+                    if total_pixels == 0:
+                        pbar.update(1)
+                        continue
+                    # Filter based on threshold values for the minority class percentages
+                    if any(class_counts[name] / total_pixels >= thresholds[iteration-1] for name in minority):
                         move_corrisponding_sar(image, folder.replace("mask","SAR"), iteration)  # Move corresponding SAR image
                         shutil.copy(image_path, os.path.join(filtered_images_path, folder, image))  # Copy the image to the new location
                                 
@@ -80,14 +83,14 @@ def move_corrisponding_sar(mask_img_name, category, iteration):
     shutil.copy(os.path.join(split_images_path, mask_img_name), os.path.join(base_path, f"filtered_images{iteration}", category, mask_img_name))
 
     
-def initiate_filter(thresholds=[0.1, 0.12, 0.14, 0.16], auto=False):
+def initiate_filter(thresholds=[0.1, 0.12, 0.14, 0.16], auto=False, schema=None):
     """
     Initiate the filtering of the dataset based on the threshold value.
     Iterates through four threshold levels, filtering the dataset each time.
     """
     # Filter the dataset based on the threshold value
     for i in range(0, len(thresholds)):
-        filter_dataset(thresholds, i+1, auto)
+        filter_dataset(thresholds, i+1, auto, schema)
         print(f"Dataset filtered for threshold {thresholds[i]}.\n")
     
 
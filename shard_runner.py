@@ -0,0 +1,234 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import subprocess
+from entry import run_pipeline, report_dataset_details, create_txt_file, DEFAULT_RATIOS, DEFAULT_THRESHOLDS
+from data_point_collector import sort_class_counts
+from dataset_spliter import split_file_list
+
+
+CATEGORIES = ["val", "test", "train"]
+
+
+def shard_of_stem(stem, num_shards):
+    """
+    Get the shard a scene belongs to from a stable hash of its file stem.
+    """
+    return int(hashlib.md5(stem.encode("utf-8")).hexdigest(), 16) % num_shards
+
+
+def select_shard_files(path, shard_index, num_shards):
+    """
+    List the files in a dump directory whose stems hash to the given shard.
+    Stems are taken the same way corresponding_mask_pairs pairs SAR images with masks.
+    """
+    return sorted(file for file in os.listdir(path)
+                  if file != "readme.txt" and shard_of_stem(file.split('.')[0], num_shards) == shard_index)
+
+
+def global_split(sar_path, ratios=None):
+    """
+    Split all the scenes in the shared dump directory exactly as initiate_split would on a single node.
+    """
+    if ratios is None:
+        ratios = DEFAULT_RATIOS
+    return split_file_list([file for file in sorted(os.listdir(sar_path)) if file != "readme.txt"], *ratios)
+
+
+def run_shard(shard_index, num_shards, output_root, sar_path=None, mask_path=None, ratios=None, thresholds=None, class_schema=None):
+    """
+    Run the full pipeline on one hash partition of the scenes.
+    The shard is processed in <output_root>/shard<index> and its class counts and tile lists
+    are written to partial_stats.json there for merge_shards.
+    """
+    if sar_path is None:
+        sar_path = os.path.join(os.getcwd(), "dump_sar_here")
+    if mask_path is None:
+        mask_path = os.path.join(os.getcwd(), "dump_masks_here")
+    if thresholds is None:
+        thresholds = DEFAULT_THRESHOLDS
+    thresholds = sorted(thresholds)
+
+    shard_root = os.path.abspath(os.path.join(output_root, f"shard{shard_index}"))
+    shard_sar_path = os.path.join(shard_root, "dump_sar_here")
+    shard_mask_path = os.path.join(shard_root, "dump_masks_here")
+    os.makedirs(shard_sar_path, exist_ok=True)
+    os.makedirs(shard_mask_path, exist_ok=True)
+
+    # Copy this shard's scenes so the shared dump directories are left untouched
+    for source_path, shard_path in [(sar_path, shard_sar_path), (mask_path, shard_mask_path)]:
+        for file in select_shard_files(source_path, shard_index, num_shards):
+            shutil.copy2(os.path.join(source_path, file), os.path.join(shard_path, file))
+
+    # Split over every scene so each lands in the same set it would in a single node run
+    shard_files = set(os.listdir(shard_sar_path))
+    split = [[file for file in files if file in shard_files] for files in global_split(sar_path, ratios)]
+
+    class_counts = run_pipeline(ratios, thresholds, shard_root, class_schema=class_schema, split=split)
+
+    # Record the tiles of every tier so the merge does not have to list the shard again
+    tiles = {}
+    for tier in class_counts:
+        tier_path = os.path.join(shard_root, tier)
+        tiles[tier] = {folder: sorted(os.listdir(os.path.join(tier_path, folder))) for folder in sorted(os.listdir(tier_path))}
+
+    partial_stats = {
+        "shard_index": shard_index,
+        "num_shards": num_shards,
+        "thresholds": thresholds,
+        "class_counts": class_counts,
+        "tiles": tiles,
+    }
+    with open(os.path.join(shard_root, "partial_stats.json"), "w") as f:
+        json.dump(partial_stats, f, indent=4)
+    return shard_root
+
+
+def load_partial_stats(shard_roots):
+    """
+    Load the partial statistics of every shard and check that they belong to the same run.
+    """
+    partials = []
+    for shard_root in shard_roots:
+        with open(os.path.join(shard_root, "partial_stats.json"), "r") as f:
+            partials.append(json.load(f))
+
+    num_shards = partials[0]["num_shards"]
+    if sorted(partial["shard_index"] for partial in partials) != list(range(num_shards)):
+        raise ValueError(f"Expected exactly one partial result for each of the {num_shards} shards.")
+    if any(partial["num_shards"] != num_shards or partial["thresholds"] != partials[0]["thresholds"] for partial in partials):
+        raise ValueError("Partial results come from runs with different shard counts or thresholds.")
+    return sorted(partials, key=lambda partial: partial["shard_index"])
+
+
+def merge_class_counts(partials, tier, category):
+    """
+    Sum the class counts of one tier and category over all shards.
+    Returns None when no shard has images there.
+    """
+    merged = None
+    for partial in partials:
+        class_counts = partial["class_counts"][tier][category]
+        if class_counts is None:
+            continue
+        if merged is None:
+            merged = {}
+        for class_name, count in class_counts.items():
+            merged[class_name] = merged.get(class_name, 0) + count
+    return None if merged is None else sort_class_counts(merged)
+
+
+def merge_shards(shard_roots, output_root):
+    """
+    Combine the shard outputs into the layout of a single node run in output_root:
+    original_images, split_images, filtered_imagesN, the split and filter tile lists,
+    filtration_stats.txt and the class distribution reports.
+    """
+    shard_roots = [os.path.abspath(shard_root) for shard_root in shard_roots]
+    partials = load_partial_stats(shard_roots)
+    thresholds = partials[0]["thresholds"]
+    tiers = ["split_images"] + [f"filtered_images{i}" for i in range(1, len(thresholds)+1)]
+
+    previous_cwd = os.getcwd()
+    os.makedirs(output_root, exist_ok=True)
+    os.chdir(output_root)
+
+    try:
+        # Copy the images of every shard into the combined directories
+        for shard_root in shard_roots:
+            for tier in ["original_images"] + tiers:
+                tier_path = os.path.join(shard_root, tier)
+                for folder in sorted(os.listdir(tier_path)):
+                    os.makedirs(os.path.join(os.getcwd(), tier, folder), exist_ok=True)
+                    for image in os.listdir(os.path.join(tier_path, folder)):
+                        shutil.copy2(os.path.join(tier_path, folder, image), os.path.join(os.getcwd(), tier, folder, image))
+
+        # Concatenate the split tile lists in shard order
+        for category in CATEGORIES:
+            with open(f"split_{category}.txt", "w") as f:
+                for partial in partials:
+                    for image in partial["tiles"]["split_images"].get(f"{category}_SAR", []):
+                        f.write(f"{image}\n")
+
+        # Write the filtration statistics from the combined tiers
+        with open("filtration_stats.txt", "w") as f:
+            for i in range(1, len(thresholds)+1):
+                previous_tier = tiers[i-1]
+                for folder in os.listdir(os.path.join(os.getcwd(), previous_tier)):
+                    if not folder.lower().endswith("mask") or len(os.listdir(os.path.join(os.getcwd(), previous_tier, folder))) == 0:
+                        continue
+                    f.write(f"{folder} @{thresholds[i-1]*100}%:\n")
+                    f.write(f"Total Images: {len(os.listdir(os.path.join(os.getcwd(), previous_tier, folder)))}\n")
+                    f.write(f"Filtered Image Total: {len(os.listdir(os.path.join(os.getcwd(), tiers[i], folder)))}\n\n")
+
+        # Report the merged class distributions in the same order as a single node run
+        merged_counts = {}
+        for tier in tiers:
+            if tier != "split_images":
+                print(f"\nFiltered Dataset {tier[len('filtered_images'):]}")
+            merged_counts[tier] = {}
+            for category in CATEGORIES:
+                mask_path = os.path.join(os.getcwd(), tier, f"{category}_mask")
+                class_counts = merge_class_counts(partials, tier, category)
+                merged_counts[tier][category] = class_counts
+                if class_counts is None:
+                    print(f"No images to process in {category}.")
+                    continue
+                report_dataset_details(mask_path, category, class_counts, len(os.listdir(mask_path)), auto=True)
+            if tier != "split_images":
+                create_txt_file(int(tier[len('filtered_images'):]))
+        return merged_counts
+    finally:
+        os.chdir(previous_cwd)
+
+
+def run_local_shards(num_shards, output_root, sar_path=None, mask_path=None, ratios=None, thresholds=None, class_schema=None):
+    """
+    Run every shard as its own local process, standing in for separate nodes, then merge them into output_root.
+    Each shard's console output is written to <output_root>/shard<index>.log.
+    """
+    if sar_path is None:
+        sar_path = os.path.join(os.getcwd(), "dump_sar_here")
+    if mask_path is None:
+        mask_path = os.path.join(os.getcwd(), "dump_masks_here")
+    output_root = os.path.abspath(output_root)
+    os.makedirs(output_root, exist_ok=True)
+
+    # Hand the class schema to the workers as a file
+    if isinstance(class_schema, dict):
+        with open(os.path.join(output_root, "class_schema.json"), "w") as f:
+            json.dump(class_schema, f)
+        class_schema = os.path.join(output_root, "class_schema.json")
+
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "entry.py"), "shard",
+               "--num-shards", str(num_shards), "--output-root", output_root,
+               "--sar-path", os.path.abspath(sar_path), "--mask-path", os.path.abspath(mask_path)]
+    if ratios is not None:
+        command += ["--ratios"] + [str(ratio) for ratio in ratios]
+    if thresholds is not None:
+        command += ["--thresholds"] + [str(threshold) for threshold in thresholds]
+    if class_schema is not None:
+        command += ["--class-schema", os.path.abspath(class_schema)]
+
+    # Start all the shards before waiting on any of them
+    processes = []
+    for shard_index in range(num_shards):
+        log = open(os.path.join(output_root, f"shard{shard_index}.log"), "w")
+        processes.append((subprocess.Popen(command + ["--shard-index", str(shard_index)], stdout=log, stderr=subprocess.STDOUT), log))
+
+    failed = []
+    for shard_index, (process, log) in enumerate(processes):
+        if process.wait() != 0:
+            failed.append(shard_index)
+        log.close()
+    if failed:
+        raise RuntimeError(f"Shards {', '.join(str(i) for i in failed)} failed, see their logs in {output_root}.")
+
+    return merge_shards([os.path.join(output_root, f"shard{i}") for i in range(num_shards)], output_root)
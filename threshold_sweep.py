@@ -0,0 +1,135 @@
+"""
+    Orginization: Intelligent Systems Lab (ISL) at the University of Fayetteville
+    Project: SAR Image Segmentation for IMPACT 1
+"""
+
+import os
+import csv
+import time
+import argparse
+import numpy as np
+from balanced_sampler import load_tile_histograms
+from class_schema import load_class_schema, minority_classes, build_lookup_table
+
+
+def build_sweep_table(histograms, schema=None):
+    """
+    Build the sorted arrays used to evaluate any threshold without touching the images.
+    Each tile is keyed by the largest of its minority class fractions, the same value filter_dataset
+    compares against the threshold. Returns the class names, the sorted keys and the suffix sums of the
+    class counts in key order, with a final row of zeros.
+    Columns follow the class order of the schema, not the count-sorted order of each histogram, so every
+    category of a sweep has the same columns.
+    """
+    names = build_lookup_table(schema)[0]
+    counts = np.array([[histogram[name] for name in names] for histogram in histograms.values()], dtype=np.int64)
+    totals = counts.sum(axis=1)
+
+    # Fraction of each minority class in each tile, matching the division done in filter_dataset
+    minority = [names.index(name) for name in minority_classes(schema)]
+    keys = (counts[:, minority] / np.maximum(totals, 1)[:, None]).max(axis=1)
+    # Tiles with every pixel ignored are skipped by filter_dataset, so they fail every threshold
+    keys[totals == 0] = -np.inf
+
+    # Sort the tiles by key and sum the class counts from each position to the end
+    order = np.argsort(keys, kind="stable")
+    suffix = np.zeros((len(keys) + 1, len(names)), dtype=np.int64)
+    suffix[:-1] = np.cumsum(counts[order][::-1], axis=0)[::-1]
+    return names, keys[order], suffix
+
+
+def evaluate_thresholds(keys, suffix, thresholds):
+    """
+    Get the surviving tile count and class counts for every threshold with a binary search.
+    A tile survives when its key is at or above the threshold. Because filter_dataset applies sorted
+    thresholds to the previous tier, this is also the content of each filtered_imagesN tier.
+    """
+    positions = np.searchsorted(keys, np.asarray(thresholds, dtype=np.float64), side="left")
+    return len(keys) - positions, suffix[positions]
+
+
+def sweep_category(histograms, thresholds, schema=None):
+    """
+    Sweep the thresholds over the tile histograms of one category.
+    Returns the class names, the surviving tile counts and the class counts for each threshold.
+    """
+    names, keys, suffix = build_sweep_table(histograms, schema)
+    tiles, class_counts = evaluate_thresholds(keys, suffix, thresholds)
+    return names, tiles, class_counts
+
+
+def print_sweep(category, thresholds, names, tiles, class_counts):
+    # Display the surviving tiles and class percentages for each threshold
+    print(f"\n{category.capitalize()} threshold sweep: ")
+    print(f"{'threshold':>10}{'tiles':>10}" + "".join(f"{name:>13}" for name in names))
+    for threshold, tile_count, counts in zip(thresholds, tiles, class_counts):
+        total_pixels = counts.sum()
+        percentages = counts / total_pixels * 100 if total_pixels > 0 else np.zeros(len(names))
+        print(f"{threshold:>10.4f}{tile_count:>10,}" + "".join(f"{percentage:>12.3f}%" for percentage in percentages))
+
+
+def write_sweep_csv(csv_path, results):
+    """
+    Write the sweep of every category to a CSV file with one row per category and threshold.
+    Every category is swept with the same schema, so all rows share the class columns of the header.
+    """
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        names = next(iter(results.values()))[1]
+        writer.writerow(["category", "threshold", "tiles"] + names + [f"{name}_percentage" for name in names])
+        for category, (thresholds, _, tiles, class_counts) in results.items():
+            for threshold, tile_count, counts in zip(thresholds, tiles, class_counts):
+                total_pixels = counts.sum()
+                percentages = [count / total_pixels * 100 if total_pixels > 0 else 0.0 for count in counts]
+                writer.writerow([category, threshold, tile_count] + counts.tolist() + [f"{percentage:.3f}" for percentage in percentages])
+
+
+def initiate_sweep(thresholds, categories=["val", "test", "train"], schema=None, csv_path=None, base_path=None, quiet=False):
+    """
+    Sweep the thresholds over each category of the split images and print or export the curve.
+    Per tile class counts are cached in <category>_tile_histograms.json so later sweeps skip decoding.
+    """
+    if base_path is None:
+        base_path = os.path.join(os.getcwd(), "split_images")
+
+    results = {}
+    for category in categories:
+        mask_path = os.path.join(base_path, f"{category}_mask")
+        histograms = load_tile_histograms(mask_path, f"{category}_tile_histograms.json", schema)
+        if len(histograms) == 0:
+            print(f"No images to sweep in {category}.")
+            continue
+
+        # Only the sweep itself is timed, decoding the masks is a one time cost
+        start = time.perf_counter()
+        names, tiles, class_counts = sweep_category(histograms, thresholds, schema)
+        results[category] = (thresholds, names, tiles, class_counts)
+        elapsed = time.perf_counter() - start
+        if not quiet:
+            print_sweep(category, thresholds, names, tiles, class_counts)
+        print(f"Evaluated {len(thresholds)} thresholds for {category} in {elapsed * 1000:.1f} ms.")
+
+    if csv_path is not None and results:
+        write_sweep_csv(csv_path, results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate filtration thresholds without materializing the filtered tiers.")
+    parser.add_argument("--thresholds", nargs="+", type=float, help="Thresholds to evaluate (Default: --start to --stop in --steps).")
+    parser.add_argument("--start", type=float, default=0.0, help="Lowest threshold of the sweep.")
+    parser.add_argument("--stop", type=float, default=0.5, help="Highest threshold of the sweep.")
+    parser.add_argument("--steps", type=int, default=101, help="Number of thresholds in the sweep.")
+    parser.add_argument("--categories", nargs="+", default=["val", "test", "train"], help="Categories to sweep.")
+    parser.add_argument("--class-schema", help="JSON class schema mapping class names to label values or RGB colors.")
+    parser.add_argument("--csv", help="Export the sweep to this CSV file.")
+    parser.add_argument("--quiet", action="store_true", help="Do not print the sweep tables.")
+    args = parser.parse_args()
+
+    thresholds = sorted(args.thresholds) if args.thresholds else np.linspace(args.start, args.stop, args.steps).tolist()
+    schema = load_class_schema(args.class_schema) if args.class_schema else None
+    initiate_sweep(thresholds, args.categories, schema, args.csv, quiet=args.quiet)
+
+
+if __name__ == "__main__":
+    main()